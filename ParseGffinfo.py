@@ -1,6 +1,195 @@
+import io
+import os
 import random
 import re
-from collections import defaultdict
+import stat
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import filterfalse, islice
+from operator import itemgetter, methodcaller
+
+_READ_SIZE = 1 << 20 # bytes read per os.read call
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0) # no newline translation on Windows
+_CHUNK_SIZE = 8 << 20 # bytes per range of chunk_offsets, scanned by one worker task
+_ATTR_BATCH = 4096 # attribute columns of a feature type searched for keys at once
+_MAX_BAD_EXAMPLES = 20 # unknown-format lines kept as examples by detect_attr_format
+_STABLE_ROWS = 32 # rows without anything new after which detect_attr_format stops
+
+# Patterns used by detect_attr_format, compiled once
+_RE_COMMA_IN_QUOTES = re.compile(r'"[^"]*,[^"]*"')
+_RE_COMMA_BETWEEN_SEMI = re.compile(r';[^;]*,[^;]*;')
+_RE_GTF_ASSIGN = re.compile(r'\w+\s+"[^"]+"')
+
+# Intern tables for the low-cardinality columns (source, feature type),
+# keyed on the raw bytes token, so each distinct value is decoded once
+# and the same str object is shared by every line that has it.
+_src_intern = {}
+_ft_intern = {}
+
+@lru_cache(maxsize=None)
+def _attr_key_re(separator, assigner):
+    """
+    Compile the regex finding attribute keys for a separator/assigner pair.
+    Cached, so parsers with the same marks share one compiled pattern.
+
+    A key starts at the beginning of the column or after a separator,
+    and runs up to the assigner or the next separator (surrounding
+    whitespace excluded); an attribute without assigner is a key as a whole.
+    """
+    marks = re.escape(separator.encode() + assigner.encode())
+    return re.compile(
+        rb"(?:^|" + re.escape(separator.encode()) + rb")\s*([^" + marks + rb"]*[^" + marks + rb"\s])")
+
+def _advise(fd, advice):
+    """Give the kernel an os.posix_fadvise hint for the whole file, where supported"""
+    if not hasattr(os, "posix_fadvise") or not stat.S_ISREG(os.fstat(fd).st_mode):
+        return # pipes and terminals (e.g. /dev/stdin) take no hints (ESPIPE)
+    try:
+        os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+    except OSError:
+        pass # only a hint; reading works the same without it
+
+def read_blocks(path):
+    """
+    Yield a file in large blocks of whole lines (bytes).
+
+    The file is read with os.read rather than through a buffered text
+    file object; a partial last line is carried over to the next block.
+    Reads are sequential, so pipes (e.g. /dev/stdin) work as well.
+
+    Args:
+        - path (str or int): file path, or a file descriptor already opened
+          with os.open. A descriptor is read from offset 0 (if seekable)
+          and left open, so it can be scanned again without re-opening the file.
+    """
+    own_fd = not isinstance(path, int)
+    fd = os.open(path, _OPEN_FLAGS) if own_fd else path
+    _advise(fd, "POSIX_FADV_SEQUENTIAL") # larger kernel readahead while lines are parsed
+    try:
+        if not own_fd:
+            try:
+                os.lseek(fd, 0, os.SEEK_SET) # rescan from the start
+            except OSError:
+                pass # not seekable (pipe): read on from where it is
+        tail = b""
+        while True:
+            block = os.read(fd, _READ_SIZE)
+            if not block:
+                break
+            if tail:
+                block = tail + block
+            end = block.rfind(b"\n") + 1
+            if end:
+                yield block[:end]
+            tail = block[end:]
+        if tail:
+            yield tail
+    finally:
+        if own_fd:
+            os.close(fd)
+
+def read_lines(path):
+    """
+    Yield the lines of a file as bytes, newline included.
+
+    Lines are cut out of each block of read_blocks in C (io.BytesIO iteration).
+
+    Args:
+        - path (str or int): file path or file descriptor, as for read_blocks
+    """
+    for block in read_blocks(path):
+        yield from io.BytesIO(block)
+
+def read_matching_lines(path, needle, ignore_case=False):
+    """
+    Yield only the lines of a file that contain needle, as bytes, newline included.
+
+    Each block of read_blocks is searched with bytes.find, in C, and only the
+    lines around a hit are cut out; other lines are never handled one by one.
+
+    Args:
+        - path (str or int): file path or file descriptor, as for read_blocks
+        - needle (bytes): text to look for
+        - ignore_case (bool): match needle in any case (needle given in lowercase)
+    """
+    for block in read_blocks(path):
+        searched = block.lower() if ignore_case else block
+        hit = searched.find(needle)
+        while hit >= 0:
+            start = block.rfind(b"\n", 0, hit) + 1
+            end = block.find(b"\n", hit) + 1 or len(block)
+            yield block[start:end]
+            hit = searched.find(needle, end) # next hit on a later line
+
+def chunk_offsets(path, chunk_size=_CHUNK_SIZE):
+    """
+    Split a file into (start, end) byte ranges of about chunk_size,
+    each moved forward to start at the beginning of a line,
+    so the ranges can be scanned independently (e.g. in worker processes).
+    """
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, "rb") as f:
+        for pos in range(chunk_size, size, chunk_size):
+            if pos <= starts[-1]:
+                continue # previous range already went past this point (long line)
+            f.seek(pos - 1)
+            f.readline() # move to the start of the next line
+            if f.tell() >= size:
+                break
+            starts.append(f.tell())
+    return list(zip(starts, starts[1:] + [size]))
+
+def read_range(path, start, end):
+    """
+    Return the bytes in range [start, end) of a file (e.g. one range of
+    chunk_offsets), read with os.lseek and os.read: no text decoding or buffer copy.
+
+    Args:
+        - path (str or int): file path, or a seekable file descriptor opened
+          with os.open (moved to end, and left open)
+    """
+    own_fd = not isinstance(path, int)
+    fd = os.open(path, _OPEN_FLAGS) if own_fd else path
+    try:
+        os.lseek(fd, start, os.SEEK_SET)
+        parts = []
+        left = end - start
+        while left > 0: # os.read may return less than asked for large ranges
+            data = os.read(fd, left)
+            if not data:
+                break
+            parts.append(data)
+            left -= len(data)
+        return b"".join(parts)
+    finally:
+        if own_fd:
+            os.close(fd)
+
+def map_in_workers(func, args, max_workers=None):
+    """
+    Yield func(*a) for each tuple a in args, in order
+    (e.g. one tuple per range of chunk_offsets).
+
+    With more than one call and more than one worker, the calls run in a
+    process pool, so func must be defined at module level. Otherwise they
+    run in this process, without starting any worker.
+    As with any process pool, a script reaching the pool must run under
+    if __name__ == "__main__":  on platforms starting workers with
+    "spawn" (macOS, Windows).
+
+    Args:
+        - func: function to call
+        - args (list of tuples): positional arguments of each call
+        - max_workers (int): number of worker processes (default None: one per CPU)
+    """
+    if len(args) > 1 and (max_workers or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            yield from pool.map(func, *zip(*args))
+    else:
+        for a in args:
+            yield func(*a)
 
 class ParseGFFinfo(object):
     """
@@ -14,6 +203,11 @@ class ParseGFFinfo(object):
         - delimiter: "\\t" (tab)
         - separator = ";"
         - assigner = "="   
+
+    The file is kept open between scans; use close() or a with-statement
+    to release it:
+        with ParseGFFinfo("thisisgff.gff3") as gff:
+            gff.featuretype()
     """
     
     def __init__(self, filepath, delimiter = "\t", separator = ";", assigner = "="):
@@ -27,35 +221,102 @@ class ParseGFFinfo(object):
 
         self.filepath = filepath
         self.delimiter = delimiter
+        self._delimiter = delimiter.encode() # lines are scanned as bytes
         self.separator = separator
         self.assigner = assigner
         self.format = "Unknown"
-        self.lines = []
-
-        # Read file once and keep valid (non-comment) lines
-        with open(filepath, 'r') as gff:
-            for line in gff:
-                if line.startswith("#"):
-                    continue
-                fields = line.rstrip().split(self.delimiter)
-                if len(fields) >= 2:
-                    self.lines.append(fields)
-        if not self.lines:
+
+        # Lines are streamed from the file on demand (see _iter_fields),
+        # only the results of each accessor are kept.
+        self._source_cache = None
+        self._featuretype_cache = None
+        self._ft_by_source_cache = None
+        self._attr_index = None # {featuretype (lowercase): set of attribute keys}
+        self._attr_index_marks = None # (separator, assigner) the index was built with
+        self._fd = os.open(filepath, _OPEN_FLAGS) # reused by every scan, see close()
+
+        if next(self._iter_fields(attrs=False), None) is None:
             print("!!! Check the file. No valid lines found.")
 
-    def detect_attr_format(self, max_lines=100, apply=True):
+    def close(self):
+        """Close the file kept open for scanning"""
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def _iter_fields(self, attrs=True, raw=False):
+        """
+        Stream valid (non-comment) lines of the file.
+
+        The file is read in blocks (see read_lines) and each line is split as
+        bytes, only as far as the last needed column; only those columns are decoded.
+
+        Args:
+            - attrs (bool) : if False, column 9 is not split off nor decoded
+            - raw (bool) : if True, the whole line (bytes, stripped) is added as a 5th item
+
+        Yields only the columns used downstream, as 4-tuples:
+        (seqid, source, featuretype, attributes); missing columns are None.
+        Attributes are left as raw bytes, to be decoded by the caller if needed.
+        """
+        maxsplit = 9 if attrs else 3
+        # fall back to re-opening the file by path if close() was called
+        for line in read_lines(self.filepath if self._fd is None else self._fd):
+            if line.startswith(b"#"):
+                continue
+            line = line.rstrip()
+            fields = line.split(self._delimiter, maxsplit)
+            if len(fields) < 2:
+                continue
+            src = fields[1]
+            ft = fields[2] if len(fields) >= 3 else None
+            row = (
+                fields[0].decode(),
+                _src_intern.get(src) or _src_intern.setdefault(src, src.decode()),
+                None if ft is None else (_ft_intern.get(ft) or _ft_intern.setdefault(ft, ft.decode())),
+                fields[8] if attrs and len(fields) >= 9 else None,
+            )
+            yield row + (line,) if raw else row
+
+    def detect_attr_format(self, max_lines=100, apply=True, random_sample=False):
         """
         This is to detect likely format that attribute string is using.
         
         Args:
             - max_lines (int) : number of lines to look at for format detection
+                                (stops earlier once the format is clearly settled)
             - apply (bool) : if True, update self.separator, self.assigner, self.format
+            - random_sample (bool) : if True, look at max_lines lines picked at random
+                                     from the whole file instead of the first ones
+                                     (reads the whole file once, keeps only max_lines lines)
 
         Returns:
             - dictionary: detected likely format of attributes
         """
         
-        if not self.lines:
+        if random_sample:
+            # reservoir sampling (Algorithm R): one pass, only max_lines rows kept
+            lines_to_check = []
+            for i, f in enumerate(self._iter_fields(raw=True)):
+                if i < max_lines:
+                    lines_to_check.append(f)
+                else:
+                    j = random.randrange(i + 1)
+                    if j < max_lines:
+                        lines_to_check[j] = f
+        else:
+            # Look at the first max_lines lines only, so the whole file is never loaded
+            lines_to_check = list(islice(self._iter_fields(raw=True), max_lines))
+        if not lines_to_check:
             print("No lines loaded. Please check the file or initialization")
             return
         
@@ -67,30 +328,36 @@ class ParseGFFinfo(object):
         unknown_asgn_count = 0
         bad_lines =[]
         sample_lines = []
+        last_state = None
+        stable_for = 0 # rows in a row that added no new candidate or subformat
+        rows_checked = 0 # rows looked at before the loop ended or stopped early
 
-        lines_to_check = random.sample(self.lines, min(max_lines, len(self.lines)))
         for f in lines_to_check:
-            if len(f) < 9:
+            rows_checked += 1
+            if f[3] is None:
                 continue
-            attrs = f[8].strip()
+            attrs = f[3].decode().strip()
             if not attrs:
                 continue
+            # cheap character checks first, the regexes only run if they can match
+            has_semi = ";" in attrs
+            has_quote = '"' in attrs
 
             # Check separator
             found_sep = False
-            if ";" in attrs:
+            if has_semi:
                 sep_candidates.add(";")
                 found_sep = True
 
             if "," in attrs:
                 # comma is tricky. 
                 # First, check if comma is found inside quotes (GTFlike)
-                if re.search(r'"[^"]*,[^"]*"', attrs): 
+                if has_quote and _RE_COMMA_IN_QUOTES.search(attrs): 
                     subformats.add("',' inside quoted value")
                         
                 # Second, check if GFF3 standard format, then likely comma is subseparator
                 elif ";" in sep_candidates:
-                    if re.search(r';[^;]*,[^;]*;', attrs):
+                    if has_semi and _RE_COMMA_BETWEEN_SEMI.search(attrs):
                         subformats.add("',' inside values with separator';'")
                         
                 # Otherwise, assume comma as a separator, but adding comment in subformat
@@ -105,23 +372,37 @@ class ParseGFFinfo(object):
 
             if not found_sep:
                 unknown_sep_count += 1
-                bad_lines.append(self.delimiter.join(f).strip()) # to present example lines with unknown separator
+                if len(bad_lines) < _MAX_BAD_EXAMPLES: # to present example lines with unknown separator
+                    bad_lines.append(f[4].decode())
                     
             # Check assigner
             if "=" in attrs: # Standard GFF3
                 assign_candidates.add("=")
-            elif re.search(r'\w+\s+"[^"]+"', attrs): # standard GTF (e.g., gene_id "Gene1"
+            elif has_quote and _RE_GTF_ASSIGN.search(attrs): # standard GTF (e.g., gene_id "Gene1"
                 assign_candidates.add(" ")
                 any_quotes = True
 
             else: 
                 unknown_asgn_count += 1
-                bad_lines.append(self.delimiter.join(f).strip()) # to present example lines with unknown assigner
+                if len(bad_lines) < _MAX_BAD_EXAMPLES: # to present example lines with unknown assigner
+                    bad_lines.append(f[4].decode())
                     
             # Quotation mark 
-            if '"' in attrs:
+            if has_quote:
                 any_quotes = True
 
+            # Stop early once the format is settled: a single separator and assigner,
+            # no unknown lines, and nothing new for _STABLE_ROWS rows
+            state = (len(sep_candidates), len(assign_candidates), len(subformats), any_quotes)
+            if state != last_state:
+                last_state = state
+                stable_for = 0
+            else:
+                stable_for += 1
+                if (stable_for >= _STABLE_ROWS and state[0] == 1 and state[1] == 1
+                        and not unknown_sep_count and not unknown_asgn_count):
+                    break
+
         quoting = "present" if any_quotes else "absent"
 
         # Report unknowns 
@@ -166,7 +447,7 @@ class ParseGFFinfo(object):
 
         # Print summary
         print("\n====== Attribute Format Detection Summary ======")
-        print(f"Analyzed up to {max_lines} lines.")
+        print(f"Analyzed {rows_checked} lines (up to {max_lines}).")
         print(f"Format                : {format_likely}")
         print(f"Detected separator(s) : {', '.join(sep_candidates) or 'none'}")
         print(f"Detected assigner(s)  : {', '.join(assign_candidates) or 'none'}")
@@ -191,54 +472,194 @@ class ParseGFFinfo(object):
 
         return result
     
+    # scan columns 2 and 3 for source, featuretype and featuretype_by_source
+    def _scan_columns(self):
+        """
+        Scan the file once and fill the results of source(), featuretype()
+        and featuretype_by_source() together.
+
+        Only the unique (source, feature type) combinations are kept;
+        sources and feature types are then read off that small table
+        instead of off every line.
+
+        Each block of lines goes through a chain of C-level iterators
+        (filter comments, strip, split, take columns 2-3, add to a set), so no
+        Python code runs per line. A block with a line of fewer than 3
+        columns is redone line by line. Lines are stripped before splitting,
+        as in _iter_fields, so both scans agree on empty trailing columns.
+        """
+        delimiter = self._delimiter
+        is_comment = methodcaller("startswith", b"#")
+        split = methodcaller("split", delimiter, 3)
+        raw_sources = set() # sources of lines without a feature type column
+        raw_pairs = set() # unique (source, feature type) bytes
+        fd = self.filepath if self._fd is None else self._fd
+        for block in read_blocks(fd):
+            lines = filterfalse(is_comment, io.BytesIO(block))
+            stripped = map(bytes.rstrip, lines)
+            columns = map(split, stripped)
+            try:
+                raw_pairs.update(map(itemgetter(1, 2), columns))
+            except IndexError:
+                for line in filterfalse(is_comment, io.BytesIO(block)):
+                    fields = line.rstrip().split(delimiter, 3)
+                    if len(fields) >= 3:
+                        raw_pairs.add((fields[1], fields[2]))
+                    elif len(fields) == 2:
+                        raw_sources.add(fields[1])
+
+        sources = {_src_intern.get(src) or _src_intern.setdefault(src, src.decode()) for src in raw_sources}
+        ft_by_source = defaultdict(set)
+        for src, ft in raw_pairs:
+            ft_by_source[_src_intern.get(src) or _src_intern.setdefault(src, src.decode())].add(
+                _ft_intern.get(ft) or _ft_intern.setdefault(ft, ft.decode()))
+        self._set_column_caches(sources, ft_by_source)
+
+    def _set_column_caches(self, sources, ft_by_source):
+        """
+        Fill the results of source(), featuretype() and featuretype_by_source().
+
+        Args:
+            - sources (set): sources of lines without a feature type column
+            - ft_by_source (dict): source -> set of feature types
+        """
+        self._ft_by_source_cache = dict(ft_by_source)
+        self._source_cache = sources.union(ft_by_source)
+        self._featuretype_cache = set().union(*ft_by_source.values())
+
+    # all column summaries at once
+    def scan_all(self):
+        """
+        Return (source, featuretype, featuretype_by_source) results together,
+        from a single pass over the file.
+        """
+        if self._ft_by_source_cache is None:
+            self._scan_columns()
+        return self.source(), self.featuretype(), self.featuretype_by_source()
+
     # parse sources
     def source(self):
         """Return unique values of column 2 (source)"""
-        return {f[1] for f in self.lines if len(f)>= 2}
+        if self._source_cache is None:
+            self._scan_columns()
+        return set(self._source_cache) # a copy, so the cached result is not changed by the caller
     
     # parse feature types
     def featuretype(self):
         """Return unique values of column 3 (feature type)"""
-        return {f[2] for f in self.lines if len(f)>= 3}
+        if self._featuretype_cache is None:
+            self._scan_columns()
+        return set(self._featuretype_cache)
 
     # dictionary for feature type(s) for each source
     def featuretype_by_source(self):
         """Return dictionary mapping each source to unique feature type(s)"""
-        ft_by_source = defaultdict(set)
-        for f in self.lines:
-            if len(f) >= 3:
-                ft_by_source[f[1]].add(f[2])
-        return dict(ft_by_source)
+        if self._ft_by_source_cache is None:
+            self._scan_columns()
+        return {src: set(fts) for src, fts in self._ft_by_source_cache.items()}
     
+    # index unique attributes of every feature type in one pass
+    def _build_attr_index(self):
+        """
+        Scan the file once and map each feature type (lowercase)
+        to its set of unique attribute keys.
+
+        As every line is read anyway, the results of source(), featuretype()
+        and featuretype_by_source() are filled in the same pass.
+        """
+        # Keys are collected as raw bytes, so only the unique ones get decoded.
+        # Attribute columns are batched per feature type and joined with the
+        # separator, so the key regex runs over many lines in a single call.
+        # Batches are keyed by the (source, feature type) pair, so the
+        # feature types of each source are read off the batch keys at the
+        # end instead of being added to a set on every line.
+        find_keys = _attr_key_re(self.separator, self.assigner).findall
+        separator = self.separator.encode()
+        raw_index = defaultdict(set)
+        batches = defaultdict(list)
+        sources = set() # sources of lines without a feature type column
+        for f in self._iter_fields():
+            if f[2] is None:
+                sources.add(f[1])
+                continue
+            # f[1], f[2] are interned, feature type lowercased once per pair below
+            batch = batches[f[1], f[2]]
+            if f[3] is None: 
+                continue # if there's no attribute column, skip
+            batch.append(f[3])
+            if len(batch) >= _ATTR_BATCH:
+                raw_index[f[2]].update(find_keys(separator.join(batch)))
+                batch.clear()
+        ft_by_source = defaultdict(set)
+        for (src, ft), batch in batches.items():
+            ft_by_source[src].add(ft)
+            raw_index[ft].update(find_keys(separator.join(batch)))
+        self._attr_index = {}
+        for ft, raw_keys in raw_index.items():
+            self._attr_index.setdefault(ft.lower(), set()).update(k.decode() for k in raw_keys)
+        self._attr_index_marks = (self.separator, self.assigner)
+        if self._ft_by_source_cache is None:
+            self._set_column_caches(sources, ft_by_source)
+
+    def _attr_index_current(self):
+        """True if the attribute index exists and was built with the current marks"""
+        return (self._attr_index is not None
+                and self._attr_index_marks == (self.separator, self.assigner))
+
     # parse set of unique attributes for a given featuretype
     def attr(self, featuretype="gene"):
         """
         Return set of unique attributes for a given feature type.
         Default featuretype = 'gene'
+
+        The file is scanned once for all feature types; the index is reused
+        until separator or assigner change (e.g. by detect_attr_format).
         """
-        keys = set() # to save all unique keys
-        featuretype = featuretype.lower()
-        for f in self.lines:
-            if len(f) < 9: 
-                continue # if there's no attribute column, skip
-            if f[2].lower() != featuretype: 
-                continue
-            attributes = f[8] # get the 9th column(attributes in general gff)
-            for attr in attributes.split(self.separator):
-                attr = attr.strip()
-                if not attr: 
-                    continue
-                if self.assigner in attr:
-                    key, value = attr.split(self.assigner, 1)
-                    keys.add(key.strip())
-                else:
-                    keys.add(attr.strip())           
-        return keys
+        if not self._attr_index_current():
+            self._build_attr_index()
+        return set(self._attr_index.get(featuretype.lower(), ())) # a copy of the index entry
     
 
+# Parsers made by get_parser, reused while their file is unchanged
+_PARSER_CACHE_SIZE = 16 # parsers kept, the least recently used is dropped first
+_parser_cache = OrderedDict() # (absolute path, modification time in ns) -> ParseGFFinfo
+
+def get_parser(path):
+    """
+    Return a ParseGFFinfo for path, reusing the one made by an earlier call
+    as long as the file has not been modified since (same modification time
+    and size). Its cached results (source, featuretype, attr, ...) then come for free.
+    Only the last _PARSER_CACHE_SIZE files used are kept.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size) # size too: mtime can be coarse or reset
+    gff = _parser_cache.get(key)
+    if gff is None:
+        # drop parsers of older versions of the file
+        for old_key in [k for k in _parser_cache if k[0] == path]:
+            _parser_cache.pop(old_key).close()
+        gff = _parser_cache[key] = ParseGFFinfo(path)
+    _parser_cache.move_to_end(key)
+    while len(_parser_cache) > _PARSER_CACHE_SIZE:
+        _parser_cache.popitem(last=False)[1].close()
+    return gff
+
 # Parse different feature types and attributes between files.
 
-def find_diff_attributes(*inputs, outfile = False):
+def _scan_file(path, delimiter, separator, assigner):
+    """
+    Scan one file in a worker process of find_diff_attributes.
+
+    Returns:
+        - tuple: (set of feature types,
+                  {feature type (lowercase): set of attribute keys})
+    """
+    with ParseGFFinfo(path, delimiter, separator, assigner) as gff:
+        gff.attr() # one pass builds the attribute index and the feature types
+        return gff.featuretype(), gff._attr_index
+
+def find_diff_attributes(*inputs, outfile = False, max_workers = None):
     """
     input argument format : 
     ("label for the gff1(e.g., rice)", filepath1) tuples
@@ -247,29 +668,68 @@ def find_diff_attributes(*inputs, outfile = False):
     False(Default): output printed to screen 
     True: A text file generated with output.
 
+    max_workers :
+    Number of processes scanning the files in parallel
+    (Default None: one per CPU)
+    Files are scanned in this process instead when there is only one
+    to scan, max_workers is 1 or the files are small (under 8 MB in total).
+    As with any process pool, a script using the parallel path must call
+    find_diff_attributes under  if __name__ == "__main__":  on platforms
+    starting workers with "spawn" (macOS, Windows).
+
     Parse common and different feature types btw multiple GFFs
 
     Parse common and different attributes for each feature type btw multiple GFFs
     
     """
-    # assign labels for the final output
-    gffs = {label: ParseGFFinfo(path) for label, path in inputs}
+    # assign labels for the final output.
+    # Parsers are shared between calls, so unchanged files are not scanned again
+    gffs = {label: get_parser(path) for label, path in inputs}
     labels = list(gffs.keys())
+    to_scan = [
+        g for g in gffs.values()
+        if g._featuretype_cache is None or not g._attr_index_current()
+    ]
+
+    # a pool only pays off for several large enough files and more than one worker
+    parallel = (len(to_scan) > 1
+                and (max_workers or os.cpu_count() or 1) > 1
+                and sum(os.path.getsize(g.filepath) for g in to_scan) >= _CHUNK_SIZE)
+
+    if parallel:
+        # Start reading all files in the background now, so files waiting for
+        # a free worker are already (partly) in the page cache when scanned
+        for g in to_scan:
+            if g._fd is not None:
+                _advise(g._fd, "POSIX_FADV_WILLNEED")
+
+        # scan each file in its own process
+        scans = map_in_workers(
+            _scan_file,
+            [(g.filepath, g.delimiter, g.separator, g.assigner) for g in to_scan],
+            max_workers)
+        for g, (featuretypes, attr_index) in zip(to_scan, scans):
+            g._featuretype_cache = featuretypes
+            g._attr_index = attr_index
+            g._attr_index_marks = (g.separator, g.assigner)
+    else:
+        for g in to_scan:
+            g.attr() # one pass builds the attribute index and the feature types
 
-    # if outfile is set, open file for writing.
-    if outfile:
-        filename = f"gff_comparison_{str(labels)}.txt"
-        out = open(filename, "w")
+    # The results below come from the parsers' caches, so their files are
+    # closed now (a later scan, e.g. with other marks, re-opens the file by path)
+    for g in gffs.values():
+        g.close()
 
-        def write(*args, **kwargs):
-            print(*args, **kwargs, file=out)
-    else:
-        def write(*args, **kwargs):
-            print(*args, **kwargs)
+    # The report is collected in memory and written out once at the end
+    buf = io.StringIO()
+
+    def write(*args, **kwargs):
+        print(*args, **kwargs, file=buf)
 
     # Find distinctive feature type
     features = {label:g.featuretype() for label, g in gffs.items()}
-    common_f = set.intersection(*features.values())
+    common_f = set.intersection(*sorted(features.values(), key=len)) # smallest set first
 
     write(f"Common feature types in all files: {sorted(common_f)}")
     write("!!!Unique features found!!!")
@@ -282,15 +742,21 @@ def find_diff_attributes(*inputs, outfile = False):
     # Find distinctive attributes for each feature type
     for ft in common_f:
         attrs = {label:g.attr(featuretype=ft) for label, g in gffs.items()}
-        common_a = set.intersection(*attrs.values())
-        all_a = set.union(*attrs.values())
+        # fold from the smallest set, stop as soon as nothing is left in common
+        by_size = sorted(attrs.values(), key=len)
+        common_a = by_size[0].copy() # by_size[0] is also in attrs, used below
+        for a in by_size[1:]:
+            if not common_a:
+                break
+            common_a &= a
+        # attributes beyond the common ones; if none anywhere, all files match
+        unique = {label: attr - common_a for label, attr in attrs.items()}
 
         write(f"Feature type: {ft}")
 
-        if all_a != common_a:
+        if any(unique.values()):
             write("!!!Different attributes found!!!")
-            for label, attr in attrs.items():
-                unique_a = attr - common_a
+            for label, unique_a in unique.items():
                 if unique_a:
                     write(f"Attributes only in {label}: {sorted(unique_a)}")
         else:
@@ -299,6 +765,11 @@ def find_diff_attributes(*inputs, outfile = False):
         write(f"Number of common attribues for {ft}: {len(common_a)}")
         write(f"Common attributes for {ft}: {sorted(common_a)}\n")
         
+    # if outfile is set, write the report to a file, otherwise print it.
     if outfile:
-        out.close()
+        filename = f"gff_comparison_{str(labels)}.txt"
+        with open(filename, "w") as out:
+            out.write(buf.getvalue())
         print(f"Output written to {filename}")
+    else:
+        print(buf.getvalue(), end="")
@@ -12,6 +12,33 @@ Example:
     parse_genome_info(gff.filepath)
     cleanup_by_genome_attr(gff.filepath,genome_to_exclude="chloroplast",outfile=True)
 """
+import re
+import shutil
+
+from ParseGffinfo import read_lines, read_matching_lines
+
+_WRITE_BUFFER = 1 << 20 # bytes of output lines collected before each write
+
+def _genome_key_re(separator, assigner):
+    """
+    Compile a bytes regex finding a 'genome' key (any case) in an attributes column.
+    Used as a cheap check before parsing attributes, since most lines have none.
+    """
+    return re.compile(
+        rb"(?:^|" + re.escape(separator.encode()) + rb")\s*genome\s*" + re.escape(assigner.encode()),
+        re.IGNORECASE)
+
+def _genome_value(attributes, genome_key, separator):
+    """
+    Return the value of the genome attribute in an attributes column (bytes),
+    read from the genome key found by genome_key up to the next separator,
+    or None if there is no genome attribute.
+    """
+    m = genome_key.search(attributes)
+    if not m:
+        return None
+    end = attributes.find(separator, m.end())
+    return attributes[m.end():end if end >= 0 else None].strip()
 
 def parse_genome_info(fn, delimiter="\t", separator=";", assigner="="):
         """
@@ -32,22 +59,23 @@ def parse_genome_info(fn, delimiter="\t", separator=";", assigner="="):
         genome = set()
         genome_ft = set()
         genome_count= 0
+        genome_key = _genome_key_re(separator, assigner)
+        delimiter_b = delimiter.encode()
+        separator_b = separator.encode()
         
-        with open(fn, "r") as gff:
-            for l in gff:
-                if l.startswith("#"):
-                     continue
-                fields = l.rstip().split(delimiter)
-                if len(fields) < 9:
-                    continue
-                attrs = {
-                        kv.split(assigner,1)[0].strip().lower(): kv.split(assigner,1)[1].strip()
-                        for kv in fields[8].split(separator) if assigner in kv
-                        }
-                if "genome" in attrs:
-                    genome.add(attrs["genome"])
-                    genome_ft.add(fields[2])
-                    genome_count +=1
+        # Only lines containing 'genome' (any case) are split, found over
+        # whole blocks in C; other lines are never handled one by one.
+        for l in read_matching_lines(fn, b"genome", ignore_case=True):
+            if l.startswith(b"#"):
+                continue
+            fields = l.rstrip().split(delimiter_b, 9)
+            if len(fields) < 9:
+                continue
+            value = _genome_value(fields[8], genome_key, separator_b)
+            if value is not None:
+                genome.add(value.decode())
+                genome_ft.add(fields[2].decode())
+                genome_count +=1
 
         print(f"# of lines containing genome : {genome_count}")
         print(f"Feature types having 'genome' in attributes: {genome_ft}")
@@ -99,6 +127,15 @@ def cleanup_by_genome_attr(
     
     Returns:
         set: excluded sequence IDs (regions removed).
+
+    The file is read twice: first only the lines containing 'genome' (found
+    over whole blocks in C, see read_matching_lines) are checked for region
+    lines (ft_4_genome_attr) with an excluded genome value, then the other
+    lines are streamed to the output. No line ordering is assumed: a region
+    line may come anywhere in the file, and lines keep their input order.
+    When no region is excluded (genome_to_exclude is empty, or no region
+    line has those values), the file is copied as is instead of rewritten,
+    so lines with fewer than 9 columns are kept in that case.
                   
     """
     if genome_to_exclude is None:
@@ -109,25 +146,12 @@ def cleanup_by_genome_attr(
     exclude_set = {e.lower() for e in genome_to_exclude}
     excluded_seqids = set()
 
-    # Identify seqIDs of regions to exclude
-    with open(fn,'r') as gff:
-        for l in gff:
-            if l.startswith("#"):
-                continue
-            fields = l.rstrip().split(delimiter)
-            if len(fields) <9:
-                continue
-            ft = fields[2].lower()
-            if ft != ft_4_genome_attr:
-                continue
-            attrs = {
-                kv.split(assigner,1)[0].strip().lower(): kv.split(assigner,1)[1].strip()
-                for kv in fields[8].split(separator) if assigner in kv
-            }
-            if "genome" in attrs and attrs["genome"].lower() in exclude_set:
-                excluded_seqids.add(fields[0])
-    
-    print(f"Found {len(excluded_seqids)} seq IDs were excluded with genome={exclude_set}")
+    # Lines are handled as raw bytes, so the marks are encoded once here
+    delimiter_b = delimiter.encode()
+    separator_b = separator.encode()
+    ft_b = ft_4_genome_attr.lower().encode() # compared with the lowercased column 3 bytes
+    exclude_b = {e.encode() for e in exclude_set}
+    genome_key = _genome_key_re(separator, assigner)
 
     # Name output file of cleaned gff
     outfn = None
@@ -136,27 +160,50 @@ def cleanup_by_genome_attr(
             outfn = outfile
         else:
             outfn = fn + "_cleaned.gff"
-    
-    out = open(outfn, 'w') if outfn else None
-
-    # Write or print filtered results
-    with open(fn,'r') as gff:
-        for l in gff:
-            if l.startswith("#"):
-                if out:
-                    out.write(l)
-                continue
-            fields = l.rstrip().split(delimiter)
-            if len(fields) <9:
+
+    # Identify seqIDs of regions to exclude; a region line with a genome
+    # attribute contains 'genome', so only those lines are split
+    excluded_b = set()
+    if not exclude_set:
+        print("No genome values given to exclude.")
+    else:
+        for l in read_matching_lines(fn, b"genome", ignore_case=True):
+            if l.startswith(b"#"):
                 continue
-            seqid = fields[0]
-            if seqid in excluded_seqids:
+            fields = l.rstrip().split(delimiter_b, 9)
+            if len(fields) < 9 or fields[2].lower() != ft_b:
                 continue
-            if out:                   
-                out.write(l)
+            value = _genome_value(fields[8], genome_key, separator_b)
+            if value is not None and value.lower() in exclude_b:
+                excluded_b.add(fields[0])
+    excluded_seqids = {seqid.decode() for seqid in excluded_b}
+
+    if outfn and not excluded_b:
+        # Nothing excluded: plain copy (kernel-side with sendfile on Linux)
+        shutil.copyfile(fn, outfn)
+    elif outfn:
+        with open(outfn, 'wb') as out:
+            batch = [] # kept lines, written to out in blocks of ~_WRITE_BUFFER bytes
+            batch_size = 0
+            for l in read_lines(fn):
+                if not l.startswith(b"#"):
+                    line = l.rstrip()
+                    if line.count(delimiter_b) < 8: # fewer than 9 columns
+                        continue
+                    # Only the seqID bytes are needed to drop the lines of excluded regions
+                    if line[:line.find(delimiter_b)] in excluded_b:
+                        continue
+                batch.append(l)
+                batch_size += len(l)
+                if batch_size > _WRITE_BUFFER:
+                    out.write(b"".join(batch))
+                    batch.clear()
+                    batch_size = 0
+            out.write(b"".join(batch))
+
+    print(f"Found {len(excluded_seqids)} seq IDs were excluded with genome={exclude_set}")
     
-    if out:
-        out.close()
+    if outfn:
         print(f">>>Cleaned file written: {outfn}")
     else:
         print("Output file not written as outfile=False.")
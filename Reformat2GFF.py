@@ -1,4 +1,104 @@
+import io
+import re
 from collections import defaultdict
+
+from ParseGffinfo import ParseGFFinfo, chunk_offsets, map_in_workers, read_range
+
+_WRITE_BUFFER = 1 << 20 # output stream buffer size
+
+# Known list-like GFF3 attributes, never quoted
+_LISTLIKE_KEYS = {b"dbxref", b"ontology_term", b"is_a", b"derives_from", b"belongs_to"}
+# Bytes that make a GFF3 value need quotes
+_QUOTE_CHARS = b" ;=,"
+
+def _ensure_valid_gff3_value(key, v):
+    """
+    Quote GFF3 attribute values only when necessary
+        e.g., product=glucose-1-phosphate adenylyltransferase large subunit
+              -> product="glucose-1-phosphate adenylyltransferase large subunit"
+    Skip quoting for knwon list-like attributes
+    Works on bytes key and value.
+    """
+    # quote text-like values
+    if key.lower() not in _LISTLIKE_KEYS:
+        if len(v.translate(None, _QUOTE_CHARS)) != len(v): # any quote-needing byte, in one C pass
+            if not (v.startswith(b'"') and v.endswith(b'"')): # check if already quoted
+                v = b'"' + v + b'"'
+    return v
+
+# A GFF3 attributes column that reformatting to GFF3 would leave unchanged:
+# key=value pairs joined by ';' with no whitespace, quotes, empty pairs,
+# and no ',' or '=' in values except ',' in list-like attributes.
+# Checked in one C-level match instead of converting each attribute.
+_CANONICAL_GFF3 = re.compile(
+    rb'(?:(?i:dbxref|ontology_term|is_a|derives_from|belongs_to)=[^;=\s"]*|[^;=\s",]+=[^;=\s",]*)'
+    rb'(?:;(?:(?i:dbxref|ontology_term|is_a|derives_from|belongs_to)=[^;=\s"]*|[^;=\s",]+=[^;=\s",]*))*')
+
+def _reformat_chunk(path, start, end, delimiter, sep, assigner, tobe):
+    """
+    Reformat the lines in byte range [start, end) of a file.
+    Kept at module level so it can run in worker processes.
+
+    Lines are handled as bytes, never decoded, and each attribute is
+    converted as it is read without building a dict for the line.
+    Attribute columns already in canonical GFF3 skip the per-attribute work:
+    copied as is to GFF3, or rewritten with two replaces to GTF.
+
+    Returns:
+        - bytes: reformatted lines (comment lines unchanged), each ending with a newline
+        - None: if the reformatted lines are the same as the input range
+                (so the caller copies it, instead of it being sent back)
+    """
+    data = read_range(path, start, end)
+
+    delim = delimiter.encode()
+    sep = sep.encode()
+    assigner = assigner.encode()
+    to_gtf = tobe == "gtf"
+    # canonical GFF3 columns can be taken as they are when marks are the GFF3 ones
+    canonical = None if sep != b";" or assigner != b"=" else _CANONICAL_GFF3.fullmatch
+
+    buf = io.BytesIO()
+    write = buf.write
+    for l in io.BytesIO(data):
+        if l.startswith(b"#"):
+            write(l if l.endswith(b"\n") else l + b"\n")
+            continue
+
+        fields = l.rstrip().split(delim, 9)
+        if len(fields) < 9:
+            continue
+
+        if canonical is not None and canonical(fields[8]):
+            if to_gtf: # no ';' or '=' inside values, so the marks can be swapped directly
+                fields[8] = fields[8].replace(b"=", b' "').replace(b";", b'"; ') + b'";'
+            write(b"\t".join(fields[:9]))
+            write(b"\n")
+            continue
+
+        # Parse attribues using detected marks 
+        # If an attribute has no assigner, its value is empty
+        new_attrs = []
+        for kv in fields[8].split(sep):
+            kv = kv.strip()
+            if not kv:
+                continue
+            k, _, v = kv.partition(assigner)
+            k = k.strip()
+            v = v.strip()
+
+            # Convert to target syntax
+            if to_gtf:
+                new_attrs.append(k + b' "' + v + b'"')
+            else: # gff3
+                new_attrs.append(k + b"=" + _ensure_valid_gff3_value(k, v))
+
+        fields[8] = b"; ".join(new_attrs) + b";" if to_gtf else b";".join(new_attrs)
+        write(b"\t".join(fields[:9]))
+        write(b"\n")
+    reformatted = buf.getvalue()
+    return None if reformatted == data else reformatted
+
 class ReformatGFF(object):
     """
     To reformat inconsistent GFF/GTF files into standardized GFF3.
@@ -12,11 +112,18 @@ class ReformatGFF(object):
             - delimiter (str): column delimiter (default = tab)
         """
         self.filepath = filepath
-        self.parser = ParseGFFinfo(filepath)
         self.delimiter = delimiter
         self.separator = None # placeholder. TBD
         self.assigner = None # placeholder. TBD
         self.format = None # placeholder. TBD
+        self._parser = None # built on first format detection
+
+    @property
+    def parser(self):
+        """ParseGFFinfo of the file, only opened when format detection needs it"""
+        if self._parser is None:
+            self._parser = ParseGFFinfo(self.filepath, delimiter=self.delimiter)
+        return self._parser
 
     def example(self):
         """
@@ -82,23 +189,26 @@ class ReformatGFF(object):
         Quote GFF3 attribute values only when necessary
             e.g., product=glucose-1-phosphate adenylyltransferase large subunit
                   -> product="glucose-1-phosphate adenylyltransferase large subunit"
-        Skip quoting for knwon list-like attributes        
+        Skip quoting for knwon list-like attributes
+        key and v are str, as before; reformat itself uses the bytes
+        function of the same name at module level.
         """
+        return _ensure_valid_gff3_value(key.encode(), v.encode()).decode()
 
-        listlike_keys = {"dbxref", "ontology_term", "is_a", "derives_from", "belongs_to"}
 
-        # quote text-like values
-        if key.lower() not in listlike_keys:
-            if any(symbol in v for symbol in [" ", ";", "=", ","]):
-                if not (v.startswith('"') and v.endswith('"')): # check if already quoted
-                    v = f'"{v}"'
-        return v
-
-
-    def reformat(self, tobe="GFF3", outfile = True):
+    def reformat(self, tobe="GFF3", outfile = True, max_workers = None):
         """
         Convert attributes to standardized GFF3 or GTF-like syntax.
         Uses detected separator/assigner if available.
+        Otherwise they are detected from the first rows only (detect_format),
+        so the file is read in full just once, by the rewrite itself.
+
+        Lines are independent, so the file is cut into ranges of whole lines
+        reformatted in parallel processes, and written back in order.
+        A file under 8 MB (one range), or max_workers=1, is reformatted in this
+        process instead. As with any process pool, a script using the parallel
+        path must call reformat under  if __name__ == "__main__":  on platforms
+        starting workers with "spawn" (macOS, Windows).
 
         Args:
             tobe (str): choose the final file to be either "GFF3" or "GTF" format. (default: GFF3)
@@ -106,6 +216,7 @@ class ReformatGFF(object):
                             True(Default) - save as filename_standardized.gff3
                             False - print to screen only
                             str - save using given filename
+            max_workers (int): number of worker processes (default None: one per CPU)
         """
         if self.separator is None or self.assigner is None: # if user didn't run detect_format in the class 
             print(">>>Detecting attribute format first...")
@@ -122,48 +233,25 @@ class ReformatGFF(object):
                else outfile if isinstance(outfile, str)
                else None)
         
-        outfile_ = open(out, "w") if out else None
+        outfile_ = open(out, "wb", buffering=_WRITE_BUFFER) if out else None
 
-        with open(self.filepath, "r") as infile:
-            for l in infile:
-                if l.startswith("#"):
-                    if outfile_:
-                        outfile_.write(l)
-                    else:
-                        print(l.strip())
-                    continue
+        chunks = chunk_offsets(self.filepath)
+        args = (self.delimiter, sep, assigner, tobe.lower())
 
-                fields = l.rstrip().split(self.delimiter)
-                if len(fields) < 9:
-                    continue
+        def emit(text, start, end):
+            if text is None: # already standard, copy the input range
+                text = read_range(self.filepath, start, end)
+            if outfile_:
+                outfile_.write(text)
+            else:
+                print(text.decode(), end="")
 
-                # Parse attribues using detected marks 
-                # If line has no assigner returns, just print
-                attrs = {}
-                for kv in fields[8].split(sep):
-                    kv = kv.strip()
-                    if not kv:
-                        continue
-                    if assigner in kv:
-                        k, v = kv.split(assigner,1)
-                        attrs[k.strip()] = v.strip()
-                    else:
-                        attrs[kv.strip()] = ""
-
-                # Convert to target syntax
-                if tobe.lower() == "gtf":
-                    new_attrs = "; ".join(f'{k} "{v}"' for k, v in attrs.items()) + ";"
-                else: # gff3
-                    valid_attrs = []
-                    for k,v in attrs.items():
-                        v = self._ensure_valid_gff3_value(k,v)
-                        valid_attrs.append(f"{k}={v}")
-                    new_attrs = ";".join(valid_attrs)
-                
-                if outfile_:
-                    outfile_.write("\t".join(fields[:8] + [new_attrs]) + "\n")
-                else:
-                    print("\t".join(fields[:8] + [new_attrs]))
+        results = map_in_workers(
+            _reformat_chunk,
+            [(self.filepath, start, end) + args for start, end in chunks],
+            max_workers)
+        for (start, end), text in zip(chunks, results):
+            emit(text, start, end)
         
         if outfile_:
             outfile_.close()
@@ -1,5 +1,104 @@
+import hashlib
+import io
+import os
+import pickle
+import re
 from collections import defaultdict
+from functools import lru_cache
+
+from ParseGffinfo import chunk_offsets, map_in_workers, read_matching_lines, read_range
+
+_WRITE_BATCH = 10000 # kept lines collected before each writelines call
+# Feature types as spelled in GFF3, mapped to the lowercase names compared below
+# (used instead of lowercasing column 3 when case_sensitive=True)
+_FEATURE_TYPES = {b"gene": b"gene", b"mRNA": b"mrna", b"transcript": b"transcript", b"CDS": b"cds"}
+_PARSED_FTS = frozenset(_FEATURE_TYPES.values()) # feature types the scan looks at
+_TRANSCRIPT_FTS = frozenset((b"mrna", b"transcript"))
+# Where scans of biotype_protein_coding are saved for later runs, with cache_dir=True
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "capstone_gff")
+_SCAN_VERSION = 1 # bump when what _scan_chunk finds changes, so older saved scans are not used
+
+@lru_cache(maxsize=None)
+def _attr_value_re(key):
+    """
+    Compile the bytes regex reading the value of one attribute key (any case):
+    the key starts the column or follows a ';', surrounded by optional spaces,
+    and its value runs up to the next ';'.
+    """
+    return re.compile(rb"(?:^|;)\s*" + re.escape(key.encode()) + rb"\s*=([^;]*)", re.IGNORECASE)
+
+def _get_attr(attributes, key):
+    """
+    Return the value of one attribute from an attributes column,
+    or None if the key is not there.
+
+    Only the wanted key is looked up, with a compiled regex running in C,
+    instead of splitting every attribute into a dict. As with the dict before,
+    the key matches in any case, spaces are stripped and the last one wins.
+
+    Args:
+        attributes (bytes): column 9 of a GFF line
+        key (str): attribute key (lowercase), e.g. "id", "parent"
+    """
+    values = _attr_value_re(key).findall(attributes)
+    return values[-1].strip().decode() if values else None
        
+def _scan_chunk(path, start, end, case_sensitive):
+    """
+    Scan the lines in byte range [start, end) of a file,
+    one range of biotype_protein_coding._scan.
+
+    Returns:
+        - tuple: (protein coding gene IDs, number of those gene lines without ID,
+                  [(parent gene, transcript ID), ...] of every transcript,
+                  transcripts having at least one CDS, comment lines)
+    """
+    data = read_range(path, start, end)
+
+    protein_coding_genes = set()
+    missing_id = 0
+    transcripts_seen = []
+    cds_parents = set()
+    header_lines = []
+    lower = not case_sensitive
+    # lowercase column 3, or only map the GFF3 spellings when case sensitive
+    feature_type = bytes.lower if lower else _FEATURE_TYPES.get
+
+    # Lines are handled as bytes; only gene, transcript and CDS lines are parsed further
+    for l in io.BytesIO(data):
+        if l.startswith(b"#"):
+            header_lines.append(l)
+            continue
+        fields = l.split(b"\t", 8) # attributes column kept whole
+        if len(fields) < 9:
+            continue
+        ft = feature_type(fields[2])
+        if ft not in _PARSED_FTS:
+            continue
+
+        # only the keys used for each feature type are looked up
+        if ft == b"gene":
+            if b"protein_coding" in (fields[8].lower() if lower else fields[8]):
+                feature_id = _get_attr(fields[8], "id")
+                if feature_id is not None:
+                    protein_coding_genes.add(feature_id)
+                else:
+                    missing_id += 1
+
+        elif ft == b"cds":
+            parent = _get_attr(fields[8], "parent")
+            if parent is not None:
+                cds_parents.add(parent)
+
+        else: # mrna, transcript
+            parent = _get_attr(fields[8], "parent")
+            if parent is not None:
+                feature_id = _get_attr(fields[8], "id")
+                if feature_id is not None:
+                    transcripts_seen.append((parent, feature_id))
+
+    return protein_coding_genes, missing_id, transcripts_seen, cds_parents, header_lines
+
 # To confirm biotype=protein_coding is in the gff, 
 # only in "gene" feature type or if anything else somehow,
 # and sources that contain protein_coding biotype attributes 
@@ -14,64 +113,236 @@ class biotype_protein_coding(object):
     parse their children(mRNA) and grandchildren(cds)
     """
 
-    def __init__(self, filepath):
-        self.filepath = filepath
+    def __init__(self, filepath, case_sensitive=False, cache_dir=None):
+        """
+        Args:
+            - filepath (str): annotation file path
+            - case_sensitive (bool): match feature types and "protein_coding"
+                    only as spelled in GFF3 (gene, mRNA, transcript, CDS),
+                    skipping the lowercase copy of columns 3 and 9 made for
+                    each line otherwise (default: False, any case)
+            - cache_dir (str, True or None): directory where the scan of gene_to_children
+                    is saved (pickle) and reused by later runs on the same,
+                    unmodified file (True: ~/.cache/capstone_gff;
+                    default None: not saved). Only the latest scan of each
+                    file is kept there.
+
+        What is parsed from the file is kept on the instance, so each method
+        scans the file at most once; it is cleared when filepath or
+        case_sensitive is changed.
+        """
+        self._filepath = filepath
+        self._case_sensitive = case_sensitive
+        self.cache_dir = _CACHE_DIR if cache_dir is True else cache_dir
+        self._reset()
+
+    def _reset(self):
+        """Forget the state parsed from the file"""
+        self._source = None # (sources, protein_coding lines, non-gene protein_coding lines)
+        self._protein_coding_genes = None
+        self._genes_missing_id = 0 # protein coding gene lines without an ID
+        self._gene_to_transcripts = None
+        self._transcript_to_gene = None
+        self._cds_parents = None # transcripts having at least one CDS
+        self._header_lines = None # comment lines, written to the filtered file
+
+    @property
+    def filepath(self):
+        return self._filepath
+
+    @filepath.setter
+    def filepath(self, filepath):
+        if filepath != self._filepath:
+            self._reset()
+        self._filepath = filepath
+
+    @property
+    def case_sensitive(self):
+        return self._case_sensitive
+
+    @case_sensitive.setter
+    def case_sensitive(self, case_sensitive):
+        if case_sensitive != self._case_sensitive:
+            self._reset()
+        self._case_sensitive = case_sensitive
 
     # Parse 1) all the sources that have protein coding biotype,
     # 2) "protein_coding" lines describing a gene
     # 3) non-gene "protein_coding" lines if any
     def source(self):
-        source = set()
-        protein_coding_lines = []
-        non_gene_protein_coding_lines = []
-        with open(self.filepath, 'r') as gff:
-            for l in gff:
-                if l.startswith("#"):
+        if self._source is None:
+            source = set()
+            protein_coding_lines = []
+            non_gene_protein_coding_lines = []
+            # Only lines containing protein_coding are cut out of the file blocks and decoded
+            for l in read_matching_lines(self.filepath, b"protein_coding"):
+                if l.startswith(b"#"):
                     continue
-                if "protein_coding" in l:
-                    fields = l.rstrip().split()
-                    if fields[2].lower() == "gene":
-                        source.add(fields[1])
-                    else:
-                        non_gene_protein_coding_lines.append(l)
-                        print(f"Non-gene protein_coding line (feature={fields[2]}):\n{l.strip()}")
-                    protein_coding_lines.append(l)
-        
+                l = l.decode()
+                fields = l.split("\t", 3) # only source and feature type are used
+                if fields[2].lower() == "gene":
+                    source.add(fields[1])
+                else:
+                    non_gene_protein_coding_lines.append(l)
+                protein_coding_lines.append(l)
+            self._source = (source, protein_coding_lines, non_gene_protein_coding_lines)
+        source, protein_coding_lines, non_gene_protein_coding_lines = self._source
+
+        for l in non_gene_protein_coding_lines:
+            feature = l.split("\t", 3)[2]
+            print(f"Non-gene protein_coding line (feature={feature}):\n{l.strip()}")
         if not protein_coding_lines:
             print("No protein_coding biotype in the file.")
         
-        return source, protein_coding_lines, non_gene_protein_coding_lines
+        # copies, so the kept state is not changed by the caller
+        return set(source), list(protein_coding_lines), list(non_gene_protein_coding_lines)
             
     # Parse protein coding genes
     def parse_proteincoding_genes(self):
         """
         Parse protein coding genes only
         """
-        genes = set()
-        with open(self.filepath, 'r') as gff:
-            for l in gff:
-                if l.startswith("#"):
+        if self._protein_coding_genes is None:
+            genes = set()
+            missing_id = 0
+            lower = not self.case_sensitive
+            # Only lines containing protein_coding (any case unless case_sensitive)
+            # are cut out of the file blocks, so the other lines are never split
+            for l in read_matching_lines(self.filepath, b"protein_coding", ignore_case=lower):
+                if l.startswith(b"#"):
                     continue
-                fields = l.rstrip().split()
+                # split on tabs only up to column 9 (attributes may contain spaces);
+                # its trailing newline is left for _get_attr to strip
+                fields = l.split(b"\t", 8)
                 if len(fields) < 9:
                     continue
-                if "protein_coding" in fields[8].lower() and fields[2].lower() == "gene":
-                    attrs = {
-                        kv.split("=")[0].strip().lower(): kv.split("=",1)[1].strip() 
-                        for kv in fields[8].split(";") 
-                        if "=" in kv}
-                    if "id" in attrs:
-                        genes.add(attrs["id"])
+                ft, attrs = (fields[2].lower(), fields[8].lower()) if lower else (fields[2], fields[8])
+                if ft == b"gene" and b"protein_coding" in attrs:
+                    gene_id = _get_attr(fields[8], "id")
+                    if gene_id is not None:
+                        genes.add(gene_id)
                     else:
-                        print("Check the file, there's no ID attributes")
-        return genes
+                        missing_id += 1
+            self._protein_coding_genes = genes
+            self._genes_missing_id = missing_id
+
+        self._warn_missing_id()
+        return set(self._protein_coding_genes)
+
+    def _warn_missing_id(self):
+        """Print a warning for each protein coding gene line found without an ID"""
+        for _ in range(self._genes_missing_id):
+            print("Check the file, there's no ID attributes")
+
+    def _scan(self, max_workers=None):
+        """
+        Read the file once, collecting together protein coding genes,
+        their transcripts, CDS parents and comment lines.
+        Transcripts are matched to genes afterwards
+        (so a gene line may come after its transcripts).
+
+        Lines are independent until that matching, so the file is cut into
+        ranges of whole lines scanned in parallel processes (_scan_chunk),
+        and their results are merged in file order.
+
+        The result is saved in cache_dir, and loaded from there instead
+        when the file has not been modified since.
+
+        Args:
+            - max_workers (int): number of worker processes (default None: one per CPU)
+        """
+        if self._load_scan():
+            return
+
+        chunks = chunk_offsets(self.filepath)
+        args = [(self.filepath, start, end, self.case_sensitive) for start, end in chunks]
+        results = map_in_workers(_scan_chunk, args, max_workers)
+
+        protein_coding_genes = set()
+        missing_id = 0
+        transcripts_seen = []
+        gene_to_transcripts = defaultdict(set)
+        transcript_to_gene = {}
+        cds_parents = set()
+        header_lines = []
+        for genes, missing, transcripts, parents, headers in results:
+            protein_coding_genes |= genes
+            missing_id += missing
+            transcripts_seen += transcripts
+            cds_parents |= parents
+            header_lines += headers
+
+        # Keep transcripts of protein coding genes only
+        for parent_gene, transcript_id in transcripts_seen:
+            if parent_gene in protein_coding_genes:
+                gene_to_transcripts[parent_gene].add(transcript_id)
+                transcript_to_gene[transcript_id] = parent_gene
+
+        self._protein_coding_genes = protein_coding_genes
+        self._genes_missing_id = missing_id
+        self._gene_to_transcripts = gene_to_transcripts
+        self._transcript_to_gene = transcript_to_gene
+        self._cds_parents = cds_parents
+        self._header_lines = header_lines
+        self._save_scan()
+
+    # Saved scan state, in this order
+    _SCAN_STATE = ("_protein_coding_genes", "_genes_missing_id", "_gene_to_transcripts",
+                   "_transcript_to_gene", "_cds_parents", "_header_lines")
+
+    def _cache_path(self):
+        """
+        Path of the saved scan of the file in cache_dir, named
+        <hash of the absolute path>-<hash of the file state>.pickle.
+        The file state is the modification time and size of the file,
+        the case_sensitive setting and _SCAN_VERSION, so a modified file
+        (or a changed scan) is scanned again.
+        """
+        st = os.stat(self.filepath)
+        path_key = hashlib.blake2b(os.path.abspath(self.filepath).encode(), digest_size=8).hexdigest()
+        state = f"{st.st_mtime_ns}:{st.st_size}:{self.case_sensitive}:{_SCAN_VERSION}"
+        state_key = hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, f"{path_key}-{state_key}.pickle")
+
+    def _load_scan(self):
+        """Load a saved scan of the file if there is one, return True if loaded"""
+        if self.cache_dir is None:
+            return False
+        try:
+            with open(self._cache_path(), "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return False # not saved yet, or unreadable: scan the file
+        for name, value in zip(self._SCAN_STATE, state):
+            setattr(self, name, value)
+        return True
+
+    def _save_scan(self):
+        """Save the scan of the file in cache_dir (skipped if it cannot be written)"""
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._cache_path()
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(tuple(getattr(self, name) for name in self._SCAN_STATE),
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path) # never leave a partly written file under the final name
+            # drop older scans of the same file
+            path_key = os.path.basename(path).split("-")[0]
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(path_key + "-") and name.endswith(".pickle") and name != os.path.basename(path):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError as e:
+            print(f"Scan not saved in {self.cache_dir}: {e}")
 
     # parse childen for protein coding genes
     # gene (ID=gene-LOC1)
     #   - mRNA(ID=rna-XM_1;Parent=gene-LOC120112099)
     #       - exon(ID=exon-XM_1-1;Parent=rna-XM1)
     #       - CDS(ID=cds-XP_1;Parent=rna-XM1)
-    def gene_to_children(self, outfile = False):
+    def gene_to_children(self, outfile = False, verbose = True, max_workers = None):
         """
         Parse children for protein coding genes
 
@@ -87,38 +358,34 @@ class biotype_protein_coding(object):
             - True : create a new GFF file(auto-named) 
                     only with complete hierarchy protein coding genes
                     (genes - mRNA - CDS)
-        
-        """
-        protein_coding_genes = self.parse_proteincoding_genes()
+        verbose (bool):
+            - True (default): print the summary table and warnings
+            - False: print nothing, only return the summary
+        max_workers (int):
+            number of processes scanning the file (default None: one per CPU)
 
-        gene_to_transcripts = defaultdict(set)
-        transcript_to_gene = {}
-        transcript_to_cds = defaultdict(bool)
-        gff_lines = [] # this is to parse when writing the filtered file
+        Returns:
+            dict: the summary table counts (and output file counts with outfile)
 
-        with open(self.filepath, 'r') as gff:
-            for l in gff:
-                if l.startswith("#"):
-                    continue
-                fields = l.rstrip().split()
-                if len(fields) < 9:
-                    continue
-                ft = fields[2].lower()
-                attrs = {
-                    kv.split("=")[0].strip().lower(): kv.split("=",1)[1].strip() 
-                    for kv in fields[8].split(";") 
-                    if "=" in kv}
-                gff_lines.append((fields, attrs, l))
-
-                if ft in {"mrna", "transcript"} and "parent" in attrs:
-                    parent_gene = attrs["parent"]
-                    if parent_gene in protein_coding_genes and "id" in attrs:
-                        transcript_id = attrs["id"]
-                        gene_to_transcripts[parent_gene].add(transcript_id)
-                        transcript_to_gene[transcript_id] = parent_gene
-                
-                elif ft == "cds" and "parent" in attrs:
-                    transcript_to_cds[attrs["parent"]] = True
+        Genes, transcripts and CDS parents come from one scan of the file (_scan),
+        run in parallel over ranges of lines and kept for later calls.
+        A file under 8 MB (one range), or max_workers=1, is scanned in this
+        process instead. As with any process pool, a script using the parallel
+        path must call gene_to_children under  if __name__ == "__main__":  on
+        platforms starting workers with "spawn" (macOS, Windows).
+        With outfile, a second pass streams the lines to keep into the new file,
+        instead of holding the lines in memory.
+        """
+        if self._cds_parents is None:
+            self._scan(max_workers)
+        protein_coding_genes = self._protein_coding_genes
+        gene_to_transcripts = self._gene_to_transcripts
+        transcript_to_gene = self._transcript_to_gene
+        cds_parents = self._cds_parents
+        header_lines = self._header_lines
+        feature_type = bytes.lower if not self.case_sensitive else _FEATURE_TYPES.get
+        if verbose:
+            self._warn_missing_id()
         
         # Summary table
         total_genes = len(protein_coding_genes)
@@ -132,7 +399,7 @@ class biotype_protein_coding(object):
                 genes_missing_transcripts += 1
                 continue
             
-            has_cds = any(transcript_to_cds[t] for t in transcripts)
+            has_cds = not transcripts.isdisjoint(cds_parents)
             if not has_cds:
                 genes_missing_cds += 1
             else:
@@ -156,30 +423,42 @@ class biotype_protein_coding(object):
             transcript_count = 0
             cds_count = 0
 
-            with open(outfn,'w') as out:
-                # Grab the header lines from the original gff
-                with open(self.filepath, 'r') as gff:
-                    for l in gff:
-                        if l.startswith("#"):
-                            out.write(l)
+            with open(outfn,'wb', buffering=1<<20) as out, open(self.filepath, 'rb', buffering=1<<20) as gff:
+                # Header lines from the original gff
+                out.writelines(header_lines)
+                batch = [] # kept lines, written _WRITE_BATCH at a time
                 
-                for fields, attrs, original_l in gff_lines:
-                    ft = fields[2].lower()
+                # Second pass: only the key each feature type is checked on is looked up
+                for original_l in gff:
+                    if original_l.startswith(b"#"):
+                        continue
+                    fields = original_l.split(b"\t", 8)
+                    if len(fields) < 9:
+                        continue
+                    ft = feature_type(fields[2])
 
-                    if ft == "gene" and "id" in attrs and attrs["id"] in genes_complete:
-                        out.write(original_l)
-                        gene_count += 1
+                    if ft == b"gene":
+                        feature_id = _get_attr(fields[8], "id")
+                        if feature_id is not None and feature_id in genes_complete:
+                            batch.append(original_l)
+                            gene_count += 1
                     
-                    elif ft in {"mrna", "transcript"} and "parent" in attrs:
-                        if attrs["parent"] in genes_complete:
-                            out.write(original_l)
+                    elif ft in _TRANSCRIPT_FTS:
+                        parent = _get_attr(fields[8], "parent")
+                        if parent is not None and parent in genes_complete:
+                            batch.append(original_l)
                             transcript_count += 1
                     
-                    elif ft == "cds" and "parent" in attrs:
-                        parent_mrna = attrs["parent"]
+                    elif ft == b"cds":
+                        parent_mrna = _get_attr(fields[8], "parent")
                         if parent_mrna in transcript_to_gene and transcript_to_gene[parent_mrna] in genes_complete:
-                            out.write(original_l)
+                            batch.append(original_l)
                             cds_count += 1
+
+                    if len(batch) >= _WRITE_BATCH:
+                        out.writelines(batch)
+                        batch.clear()
+                out.writelines(batch)
             summary.update({
                 "Genes written": gene_count,
                 "mRNA/Transcripts written": transcript_count,
@@ -187,6 +466,8 @@ class biotype_protein_coding(object):
                 "Output file": outfn
             })
 
-        print("\n====Protein Coding Gene Summary====")
-        for k,v in summary.items():
-            print(f"{k:<35}: {v}")
+        if verbose:
+            print("\n====Protein Coding Gene Summary====")
+            for k,v in summary.items():
+                print(f"{k:<35}: {v}")
+        return summary